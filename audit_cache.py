@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+
+"""
+Content-Addressed Audit Cache
+Stores contract audit results in a size-bounded SQLite file keyed by the SHA-256 of
+the normalized source plus the rule-set/model version, so repeated contracts and the
+unchanged functions of edited contracts are never analyzed twice
+"""
+
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import sys
+import tempfile
+import time
+from typing import Dict, Iterable
+
+from contract_scanner import SKIP_PATTERN, split_units, synthetic_contracts
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entries_last_used ON entries (last_used);
+"""
+
+SKIP = re.compile(SKIP_PATTERN)
+WHITESPACE = re.compile(r'\s+')
+
+def normalize_source(code: str) -> str:
+    """Source with comments dropped and whitespace collapsed (string literals kept)"""
+
+    code = SKIP.sub(lambda match: match.group() if match.group()[0] in '"\'' else ' ', code)
+    return WHITESPACE.sub(' ', code).strip()
+
+def normalize_layout(code: str) -> str:
+    """Source with line endings and trailing whitespace normalized; lines and columns are unchanged"""
+
+    return '\n'.join(line.rstrip() for line in code.replace('\r\n', '\n').split('\n')).rstrip('\n')
+
+def content_key(*parts: str) -> str:
+    return hashlib.sha256('\0'.join(parts).encode('utf-8')).hexdigest()
+
+class AuditCache:
+    """Size-bounded, content-addressed store of JSON audit results
+
+    Keys are content hashes, so an entry never goes stale: a changed source or
+    rule set simply produces a different key. When the stored values exceed
+    ``max_bytes``, the least recently used entries are evicted down to
+    ``low_water`` of the limit.
+    """
+
+    def __init__(self, path='./audit-cache.sqlite', max_bytes=256 * 2**20, low_water=0.9):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.low_water = low_water
+        self.db = None
+        self.size = 0
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def connect(self):
+        if self.db is None:
+            if os.path.dirname(self.path):
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self.db = sqlite3.connect(self.path)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.executescript(SCHEMA)
+            self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM entries').fetchone()[0]
+        return self.db
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, object]:
+        """Cached values for the keys that are present; hits are marked as recently used"""
+
+        db = self.connect()
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        for i in range(0, len(keys), 500):
+            batch = keys[i:i + 500]
+            rows = db.execute(
+                f'SELECT key, value FROM entries WHERE key IN ({",".join("?" * len(batch))})', batch
+            ).fetchall()
+            found.update((key, json.loads(value)) for key, value in rows)
+
+        if found:
+            now = time.time()
+            with db:
+                db.executemany('UPDATE entries SET last_used = ? WHERE key = ?', [(now, key) for key in found])
+        self.stats['hits'] += len(found)
+        self.stats['misses'] += len(keys) - len(found)
+        return found
+
+    def get(self, key: str):
+        return self.get_many([key]).get(key)
+
+    def put_many(self, items: Dict[str, object]):
+        db = self.connect()
+        now = time.time()
+        with db:
+            for key, value in items.items():
+                encoded = json.dumps(value)
+                # Same key means same content: an existing entry is only touched
+                if db.execute('UPDATE entries SET last_used = ? WHERE key = ?', (now, key)).rowcount:
+                    continue
+                db.execute(
+                    'INSERT INTO entries (key, value, size, last_used) VALUES (?, ?, ?, ?)',
+                    (key, encoded, len(encoded), now)
+                )
+                self.size += len(encoded)
+        if self.size > self.max_bytes:
+            self.evict()
+
+    def put(self, key: str, value):
+        self.put_many({key: value})
+
+    def evict(self):
+        """Drop least recently used entries until the cache is back under its low-water mark"""
+
+        db = self.connect()
+        target = self.max_bytes * self.low_water
+        victims = []
+        for key, size in db.execute('SELECT key, size FROM entries ORDER BY last_used'):
+            if self.size <= target:
+                break
+            victims.append((key,))
+            self.size -= size
+        with db:
+            db.executemany('DELETE FROM entries WHERE key = ?', victims)
+        self.stats['evictions'] += len(victims)
+
+    def __len__(self):
+        return self.connect().execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+def edit_last_function(code: str) -> str:
+    """The contract with one statement added to its last function (a typical small patch)"""
+
+    last = split_units(code)[-1]
+    body = last['source'].index('{') + 1
+    patched = last['source'][:body] + '\n        amount = amount / 2;' + last['source'][body:]
+    return code.replace(last['source'], patched)
+
+def benchmark_audit_cache(num_contracts=24, model_name=None):
+    """Key derivation speed, eviction bound, then cold vs repeated vs edited audits"""
+
+    import contextlib
+    import io
+
+    print("="*60)
+    print("🗄️  AUDIT CACHE BENCHMARK")
+    print("="*60)
+
+    corpus = synthetic_contracts(2_000, seed=11)
+    start_time = time.perf_counter()
+    keys = [content_key(normalize_source(unit['source'])) for code in corpus for unit in split_units(code)]
+    key_time = time.perf_counter() - start_time
+    megabytes = sum(len(code) for code in corpus) / 1e6
+    print(f"   Per-function keys: {len(keys):,} from {megabytes:.1f} MB in {key_time:.2f}s "
+          f"({megabytes / key_time:.1f} MB/s)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cache = AuditCache(os.path.join(tmp, 'bounded.sqlite'), max_bytes=200_000)
+        for i in range(0, len(keys), 100):
+            cache.put_many({key: 'x' * 500 for key in keys[i:i + 100]})
+        print(f"   Eviction: {cache.size:,} bytes kept of a {cache.max_bytes:,} byte limit "
+              f"({len(cache)} entries, {cache.stats['evictions']:,} evicted)")
+        cache.close()
+
+        try:
+            from blockchain_analyzer_demo import BlockchainAIAnalyzer
+            analyzer = BlockchainAIAnalyzer(model_name=model_name, cache_path=os.path.join(tmp, 'audit.sqlite'))
+        except Exception as e:
+            print(f"\n⚠️  Skipping audit timings (model unavailable: {e})")
+            return
+
+        contracts = synthetic_contracts(num_contracts, seed=3)
+        rounds = [
+            ('Cold cache', contracts),
+            ('Identical resubmissions', contracts),
+            ('One function edited', [edit_last_function(code) for code in contracts]),
+        ]
+        print()
+        for label, batch in rounds:
+            entries = len(analyzer.cache)
+            start_time = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                for code in batch:
+                    analyzer.analyze_smart_contract(code)
+            elapsed = time.perf_counter() - start_time
+            print(f"   {label:<24} {len(batch) / elapsed:8.2f} contracts/s ({elapsed:.2f}s), "
+                  f"{len(analyzer.cache) - entries} new cache entries (reports + functions)")
+
+if __name__ == "__main__":
+    model = sys.argv[sys.argv.index('--model') + 1] if '--model' in sys.argv else None
+    benchmark_audit_cache(model_name=model)
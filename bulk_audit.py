@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+
+"""
+Bulk Smart Contract Auditor
+Audits a directory of Solidity files or a JSONL dump of verified sources with the
+BlockchainAIAnalyzer rules: pattern and gas scans run across a process pool, the AI
+analysis is batched on one model instance, and results stream out as JSONL
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from contract_scanner import ContractScanner, synthetic_contracts
+
+SOURCE_FIELDS = ('source', 'SourceCode', 'source_code', 'code')
+ID_FIELDS = ('id', 'address', 'ContractName', 'name', 'path')
+
+def iter_contracts(source: str) -> Iterator[Dict]:
+    """Yield {'id', 'source'} from a directory of .sol files or a JSONL file, one at a time"""
+
+    if os.path.isdir(source):
+        for root, dirs, files in os.walk(source):
+            dirs.sort()
+            for filename in sorted(files):
+                if filename.endswith('.sol'):
+                    path = os.path.join(root, filename)
+                    with open(path, encoding='utf-8', errors='replace') as f:
+                        yield {'id': os.path.relpath(path, source), 'source': f.read()}
+        return
+
+    with open(source, encoding='utf-8') as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            code = next((record[field] for field in SOURCE_FIELDS if record.get(field)), None)
+            if code is None:
+                continue
+            contract_id = next((record[field] for field in ID_FIELDS if record.get(field)), f'line-{number}')
+            yield {'id': str(contract_id), 'source': code}
+
+def chunked(items: Iterable, size: int) -> Iterator[List]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+# Each worker process compiles the rules once
+WORKER_SCANNER = None
+
+def init_scan_worker():
+    global WORKER_SCANNER
+    WORKER_SCANNER = ContractScanner()
+
+def scan_chunk(sources: List[str]) -> List[Dict]:
+    """Pattern and gas findings for a chunk of sources (runs in a worker process)"""
+
+    if WORKER_SCANNER is None:
+        init_scan_worker()
+
+    results = []
+    for source in sources:
+        start_time = time.perf_counter()
+        try:
+            result = WORKER_SCANNER.scan(source)
+        except Exception as e:
+            result = {'error': f'scan failed: {e}'}
+        result['scan_time'] = time.perf_counter() - start_time
+        results.append(result)
+    return results
+
+class BulkAuditor:
+    """Streaming audit pipeline: read → scan (process pool) → AI (batched) → JSONL
+
+    At most ``window`` chunks are in flight and at most ``batch_size`` records
+    wait for the model, so memory stays flat however large the input is.
+    Results are written in input order.
+    """
+
+    def __init__(self, analyzer=None, workers: Optional[int] = None, chunk_size=32, batch_size=8, window=None):
+        self.analyzer = analyzer  # BlockchainAIAnalyzer, or None to skip the AI stage
+        if workers is None:
+            # A pool on a single CPU only adds IPC, so scan in-process there
+            cpus = os.cpu_count() or 1
+            workers = cpus if cpus > 1 else 0
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.batch_size = batch_size
+        self.window = window or max(2, 2 * self.workers)
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.reported = 0
+        self.stats = {
+            'contracts': 0, 'bytes': 0, 'errors': 0, 'vulnerabilities': 0,
+            'read': 0.0, 'scan_cpu': 0.0, 'scan_wait': 0.0, 'ai': 0.0, 'write': 0.0, 'wall': 0.0
+        }
+
+    def run(self, contracts: Iterable[Dict], output_path: str, progress_every=1_000) -> Dict:
+        """Audit every contract and append one JSON line per contract to ``output_path``"""
+
+        self.reset_stats()
+        start_time = time.perf_counter()
+        pool = ProcessPoolExecutor(self.workers, initializer=init_scan_worker) if self.workers > 0 else None
+        pending = deque()  # (chunk, future or results)
+        ai_buffer = []
+
+        try:
+            with open(output_path, 'w', encoding='utf-8') as out:
+                chunks = chunked(contracts, self.chunk_size)
+                while True:
+                    read_start = time.perf_counter()
+                    chunk = next(chunks, None)
+                    self.stats['read'] += time.perf_counter() - read_start
+                    if chunk is None:
+                        break
+
+                    sources = [contract['source'] for contract in chunk]
+                    pending.append((chunk, pool.submit(scan_chunk, sources) if pool else scan_chunk(sources)))
+                    if len(pending) >= self.window:
+                        self.collect(pending.popleft(), ai_buffer, out, progress_every)
+
+                while pending:
+                    self.collect(pending.popleft(), ai_buffer, out, progress_every)
+                self.flush_ai(ai_buffer, out)
+        finally:
+            if pool:
+                pool.shutdown()
+
+        self.stats['wall'] = time.perf_counter() - start_time
+        return self.stats
+
+    def collect(self, item, ai_buffer: List, out, progress_every: int):
+        chunk, results = item
+        if not isinstance(results, list):
+            wait_start = time.perf_counter()
+            results = results.result()
+            self.stats['scan_wait'] += time.perf_counter() - wait_start
+
+        for contract, result in zip(chunk, results):
+            self.stats['scan_cpu'] += result.pop('scan_time')
+            record = {'id': contract['id'], 'bytes': len(contract['source']), **result}
+            if self.analyzer is not None:
+                # Failed scans wait in the buffer too (without a prompt) so output keeps input order
+                ai_buffer.append((record, None if 'error' in record else contract['source']))
+                if len(ai_buffer) >= self.batch_size:
+                    self.flush_ai(ai_buffer, out)
+            else:
+                self.write(record, out)
+
+        if progress_every and self.stats['contracts'] // progress_every > self.reported:
+            self.reported = self.stats['contracts'] // progress_every
+            print(f"   ... {self.stats['contracts']:,} contracts audited")
+
+    def flush_ai(self, ai_buffer: List, out):
+        if not ai_buffer:
+            return
+
+        queued = [(record, source) for record, source in ai_buffer if source is not None]
+        ai_start = time.perf_counter()
+        try:
+            analyses = self.analyzer.ai_contract_analysis_batch(
+                [source for _, source in queued], batch_size=self.batch_size
+            ) if queued else []
+            for (record, _), analysis in zip(queued, analyses):
+                record['ai_analysis'] = analysis
+        except Exception as e:
+            for record, _ in queued:
+                record['error'] = f'AI analysis failed: {e}'
+        self.stats['ai'] += time.perf_counter() - ai_start
+
+        for record, _ in ai_buffer:
+            self.write(record, out)
+        ai_buffer.clear()
+
+    def write(self, record: Dict, out):
+        write_start = time.perf_counter()
+        out.write(json.dumps(record) + '\n')
+        self.stats['write'] += time.perf_counter() - write_start
+
+        self.stats['contracts'] += 1
+        self.stats['bytes'] += record['bytes']
+        self.stats['errors'] += 'error' in record
+        self.stats['vulnerabilities'] += len(record.get('vulnerabilities', []))
+
+def print_stats(stats: Dict, label='Bulk audit'):
+    """Throughput and per-stage timings of one BulkAuditor.run"""
+
+    wall = stats['wall'] or 1e-9
+    print(f"\n⚡ {label}:")
+    print(f"   Contracts: {stats['contracts']:,} ({stats['bytes'] / 1e6:.1f} MB), "
+          f"{stats['vulnerabilities']:,} vulnerability findings, {stats['errors']} errors")
+    print(f"   Throughput: {stats['contracts'] / wall:,.0f} contracts/s, {stats['bytes'] / 1e6 / wall:.1f} MB/s")
+    print(f"   Wall time: {wall:.2f}s")
+    print(f"   Stages: read {stats['read']:.2f}s | scan {stats['scan_cpu']:.2f}s CPU "
+          f"(waited {stats['scan_wait']:.2f}s) | AI {stats['ai']:.2f}s | write {stats['write']:.2f}s")
+
+def write_corpus(path: str, count: int, seed=7):
+    """Synthetic contracts as a JSONL corpus, in the shape iter_contracts reads"""
+
+    with open(path, 'w', encoding='utf-8') as f:
+        for i, code in enumerate(synthetic_contracts(count, seed)):
+            f.write(json.dumps({'id': f'synthetic-{i}', 'source': code}) + '\n')
+
+def benchmark_bulk_audit(num_contracts=5_000, ai_contracts=16, model_name=None):
+    """In-process vs process-pool scanning, then single vs batched AI analysis if a model loads"""
+
+    print("\n" + "="*60)
+    print("⚡ BULK AUDIT BENCHMARK")
+    print("="*60)
+    print(f"   CPUs: {os.cpu_count()}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = os.path.join(tmp, 'contracts.jsonl')
+        write_corpus(corpus, num_contracts)
+
+        outputs = {}
+        for workers in sorted({0, os.cpu_count() or 1, 2 * (os.cpu_count() or 1)}):
+            output = os.path.join(tmp, f'results-{workers}.jsonl')
+            stats = BulkAuditor(workers=workers).run(iter_contracts(corpus), output, progress_every=0)
+            print_stats(stats, 'In-process scan' if workers == 0 else f'Process pool ({workers} workers)')
+            with open(output, encoding='utf-8') as f:
+                outputs[workers] = f.read()
+
+        identical = len(set(outputs.values())) == 1
+        print(f"\n   Identical JSONL across worker counts: {'✅' if identical else '❌'}")
+
+        try:
+            from blockchain_analyzer_demo import BlockchainAIAnalyzer
+            analyzer = BlockchainAIAnalyzer(model_name=model_name)
+        except Exception as e:
+            print(f"\n⚠️  Skipping AI batching benchmark (model unavailable: {e})")
+            return
+
+        sources = [contract['source'] for contract in iter_contracts(corpus)][:ai_contracts]
+
+        try:
+            start_time = time.perf_counter()
+            for source in sources:
+                analyzer.ai_contract_analysis(source)
+            single_time = time.perf_counter() - start_time
+
+            print(f"\n⚡ AI analysis of {len(sources)} contracts, one at a time: {len(sources) / single_time:.2f} contracts/s")
+            for batch_size in (4, 8, 16):
+                start_time = time.perf_counter()
+                analyzer.ai_contract_analysis_batch(sources, batch_size=batch_size)
+                batch_time = time.perf_counter() - start_time
+                print(f"   batch_size={batch_size}: {len(sources) / batch_time:.2f} contracts/s "
+                      f"({single_time / batch_time:.1f}x)")
+        except Exception as e:
+            print(f"\n❌ AI batching benchmark failed: {e}")
+
+def usage():
+    print("Usage: python3 bulk_audit.py <dir|contracts.jsonl> [-o results.jsonl] [--workers N]")
+    print("                             [--batch-size N] [--model NAME] [--no-ai]")
+    print("       python3 bulk_audit.py benchmark [num_contracts] [--model NAME]")
+
+if __name__ == "__main__":
+    print("="*60)
+    print("🔗 BULK SMART CONTRACT AUDIT")
+    print("="*60)
+
+    args = sys.argv[1:]
+    options = {'-o': 'audit-results.jsonl', '--workers': None, '--batch-size': '8', '--model': None}
+    positional = []
+    while args:
+        arg = args.pop(0)
+        if arg in options and args:
+            options[arg] = args.pop(0)
+        elif arg == '--no-ai':
+            options['--no-ai'] = True
+        else:
+            positional.append(arg)
+
+    if not positional:
+        usage()
+        sys.exit(1)
+
+    if positional[0] == 'benchmark':
+        benchmark_bulk_audit(
+            int(positional[1]) if len(positional) > 1 else 5_000,
+            model_name=options['--model']
+        )
+        sys.exit(0)
+
+    analyzer = None
+    if not options.get('--no-ai'):
+        from blockchain_analyzer_demo import BlockchainAIAnalyzer
+        analyzer = BlockchainAIAnalyzer(model_name=options['--model'])
+
+    auditor = BulkAuditor(
+        analyzer,
+        workers=None if options['--workers'] is None else int(options['--workers']),
+        batch_size=int(options['--batch-size'])
+    )
+    scanning = f"{auditor.workers} scan workers" if auditor.workers > 0 else "in-process scanning"
+    print(f"📂 Auditing {positional[0]} with {scanning} → {options['-o']}")
+    print_stats(auditor.run(iter_contracts(positional[0]), options['-o']))
+    if analyzer is not None and analyzer.cache is not None:
+        cache_stats = analyzer.cache.stats
+        print(f"   Audit cache: {cache_stats['hits']:,} chunks reused, {cache_stats['misses']:,} generated")
+    if analyzer is not None:
+        generation = analyzer.generation_stats
+        print(f"   AI: {generation['chunks']:,} chunks, coverage "
+              f"{generation['covered_chars'] / max(generation['source_chars'], 1):.1%} of the source, "
+              f"{generation['generated_tokens'] / max(generation['seconds'], 1e-9):.1f} tokens/s")
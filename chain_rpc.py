@@ -0,0 +1,446 @@
+#!/usr/bin/env python3
+
+"""
+Chain RPC Connections
+Web3 providers that share one pooled HTTP session, concurrent per-chain health
+checks with their own timeouts, a JSON-RPC batch reader for multi-call on-chain
+reads, and a local JSON-RPC stand-in server for testing
+"""
+
+import asyncio
+import hashlib
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from aiohttp import ClientResponseError, web
+
+from market_data_client import MarketDataClient, start_stand_in_server
+
+CHAIN_RPC_URLS = {
+    'ethereum': 'https://eth.llamarpc.com',
+    'bsc': 'https://bsc-dataseed.binance.org/',
+    'polygon': 'https://polygon-rpc.com',
+    'arbitrum': 'https://arb1.arbitrum.io/rpc',
+    'optimism': 'https://mainnet.optimism.io',
+    'base': 'https://mainnet.base.org',
+}
+
+def pooled_session(pool_size=16):
+    """requests session whose connection pools are shared by every chain provider"""
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+def make_web3(url, session=None, timeout=5):
+    """Web3 client over an HTTP provider using the shared session"""
+
+    from web3 import Web3
+
+    return Web3(Web3.HTTPProvider(url, request_kwargs={'timeout': timeout}, session=session))
+
+def check_chain(w3):
+    """One eth_blockNumber round trip: (block number, latency in seconds)"""
+
+    start_time = time.perf_counter()
+    block = w3.eth.block_number
+    return block, time.perf_counter() - start_time
+
+def check_chains(connections: Dict, timeouts: Dict[str, float], default_timeout=5) -> Dict[str, Dict]:
+    """Health-check every chain at once
+
+    Each chain gets its own deadline; a chain that has not answered by then is
+    reported as a timeout without holding up the others or the caller.
+    """
+
+    executor = ThreadPoolExecutor(max_workers=max(len(connections), 1), thread_name_prefix='chain-check')
+    start_time = time.perf_counter()
+    futures = {chain: executor.submit(check_chain, w3) for chain, w3 in connections.items()}
+    deadlines = {chain: start_time + timeouts.get(chain, default_timeout) for chain in connections}
+
+    results = {}
+    pending = dict(futures)
+    while pending:
+        now = time.perf_counter()
+        for chain in [chain for chain in pending if deadlines[chain] <= now and not pending[chain].done()]:
+            pending.pop(chain)
+            results[chain] = {'status': 'timeout', 'latency': now - start_time, 'block': None,
+                              'error': f"no answer within {timeouts.get(chain, default_timeout)}s"}
+
+        for chain in [chain for chain, future in pending.items() if future.done()]:
+            future = pending.pop(chain)
+            try:
+                block, latency = future.result()
+                results[chain] = {'status': 'ok', 'latency': latency, 'block': block, 'error': None}
+            except Exception as e:
+                results[chain] = {'status': 'error', 'latency': time.perf_counter() - start_time,
+                                  'block': None, 'error': f"{type(e).__name__}: {e}"}
+
+        if pending:
+            next_deadline = min(deadlines[chain] for chain in pending)
+            wait(pending.values(), timeout=max(next_deadline - time.perf_counter(), 0),
+                 return_when=FIRST_COMPLETED)
+
+    # Abandon checks that timed out; their threads finish on their own
+    executor.shutdown(wait=False)
+    return {chain: results[chain] for chain in connections}
+
+def print_chain_status(results: Dict[str, Dict]):
+    """Status table with per-chain RPC latency"""
+
+    icons = {'ok': '✅', 'timeout': '⏱️ ', 'error': '❌'}
+    print(f"   {'Chain':<10} {'Status':<9} {'Latency':>9} {'Block':>12}")
+    for chain, result in results.items():
+        block = f"{result['block']:,}" if result['block'] is not None else '-'
+        print(f"   {chain:<10} {icons[result['status']]} {result['status']:<6} "
+              f"{result['latency'] * 1000:>7.0f}ms {block:>12}")
+        if result['error']:
+            print(f"      {result['error'][:100]}")
+
+class RPCError(Exception):
+    """A JSON-RPC error for one call (or a whole batch the endpoint rejected)"""
+
+    def __init__(self, code, message):
+        super().__init__(f"{message} (code {code})")
+        self.code = code
+        self.message = message
+
+class OnChainReader:
+    """Pack many read-only JSON-RPC calls into batch requests per chain
+
+    Calls are sent in batches of at most ``max_batch_size``. A batch the
+    endpoint rejects as a whole (HTTP error, a single error object instead of
+    a list, or missing responses) is split in half and resent, down to single
+    calls; connection failures fail the whole batch. Results come back in call order; a call that still fails has an
+    ``RPCError`` in its slot instead of a result.
+    """
+
+    def __init__(self, client: MarketDataClient, rpc_urls: Dict[str, str], max_batch_size=100,
+                 max_concurrent_batches=4):
+        self.client = client
+        self.rpc_urls = rpc_urls
+        self.max_batch_size = max_batch_size
+        self.max_concurrent_batches = max_concurrent_batches
+        self.stats = {'calls': 0, 'batches': 0, 'splits': 0}
+
+    async def batch(self, chain: str, calls: Sequence[Tuple[str, list]]) -> List:
+        """Run (method, params) calls on a chain and return their results in order"""
+
+        url = self.rpc_urls[chain]
+        results = [None] * len(calls)
+        semaphore = asyncio.Semaphore(self.max_concurrent_batches)
+        self.stats['calls'] += len(calls)
+
+        await asyncio.gather(*(
+            self.send(url, calls, list(range(start, min(start + self.max_batch_size, len(calls)))), results, semaphore)
+            for start in range(0, len(calls), self.max_batch_size)
+        ))
+        return results
+
+    async def send(self, url, calls, indices, results, semaphore):
+        payload = [{'jsonrpc': '2.0', 'id': i, 'method': calls[i][0], 'params': list(calls[i][1])} for i in indices]
+
+        try:
+            async with semaphore:
+                self.stats['batches'] += 1
+                response = await self.client.post_json(url, payload if len(payload) > 1 else payload[0])
+
+            if isinstance(response, dict) and len(indices) == 1 and response.get('id') == indices[0]:
+                response = [response]
+            if not isinstance(response, list):
+                error = (response or {}).get('error') or {}
+                raise RPCError(error.get('code', -32603), error.get('message', 'batch rejected'))
+
+            by_id = {item.get('id'): item for item in response if isinstance(item, dict)}
+            missing = [i for i in indices if i not in by_id]
+            if missing:
+                raise RPCError(-32603, f"{len(missing)} of {len(indices)} responses missing from batch")
+
+        except (RPCError, ClientResponseError) as e:
+            # The endpoint answered but rejected the batch: retry smaller batches
+            if len(indices) == 1:
+                results[indices[0]] = e if isinstance(e, RPCError) else RPCError(e.status, e.message)
+                return
+
+            self.stats['splits'] += 1
+            middle = len(indices) // 2
+            await asyncio.gather(
+                self.send(url, calls, indices[:middle], results, semaphore),
+                self.send(url, calls, indices[middle:], results, semaphore)
+            )
+            return
+        except Exception as e:
+            # Unreachable endpoint: smaller batches would not help
+            for i in indices:
+                results[i] = RPCError(-32603, f"{type(e).__name__}: {e}")
+            return
+
+        for i in indices:
+            item = by_id[i]
+            if item.get('error'):
+                results[i] = RPCError(item['error'].get('code'), item['error'].get('message'))
+            else:
+                results[i] = item.get('result')
+
+    @staticmethod
+    def to_int(value):
+        return int(value, 16) if isinstance(value, str) else None
+
+    async def get_balances(self, chain: str, addresses: Sequence[str], block='latest') -> List[Optional[int]]:
+        results = await self.batch(chain, [('eth_getBalance', [address, block]) for address in addresses])
+        return [self.to_int(result) for result in results]
+
+    async def get_transaction_counts(self, chain: str, addresses: Sequence[str], block='latest') -> List[Optional[int]]:
+        results = await self.batch(chain, [('eth_getTransactionCount', [address, block]) for address in addresses])
+        return [self.to_int(result) for result in results]
+
+    async def call(self, chain: str, calls: Sequence[Dict], block='latest') -> List:
+        """eth_call for each {'to': ..., 'data': ...}; results are hex return data"""
+
+        return await self.batch(chain, [('eth_call', [call, block]) for call in calls])
+
+    async def get_logs(self, chain: str, filters: Sequence[Dict]) -> List:
+        return await self.batch(chain, [('eth_getLogs', [log_filter]) for log_filter in filters])
+
+    async def read_accounts(self, chain: str, addresses: Sequence[str], block='latest') -> List[Dict]:
+        """Balance, nonce and contract flag for every address in one set of batches"""
+
+        calls = []
+        for address in addresses:
+            calls += [
+                ('eth_getBalance', [address, block]),
+                ('eth_getTransactionCount', [address, block]),
+                ('eth_getCode', [address, block])
+            ]
+        results = await self.batch(chain, calls)
+
+        accounts = []
+        for i, address in enumerate(addresses):
+            balance, nonce, code = results[3 * i:3 * i + 3]
+            errors = [str(result) for result in (balance, nonce, code) if isinstance(result, RPCError)]
+            accounts.append({
+                'chain': chain,
+                'address': address,
+                'balance': self.to_int(balance),
+                'nonce': self.to_int(nonce),
+                'is_contract': code not in ('0x', None) if isinstance(code, str) else None,
+                'errors': errors
+            })
+        return accounts
+
+def stand_in_value(*parts, bits=64):
+    """Deterministic pseudo-random integer for stand-in chain state"""
+
+    digest = hashlib.sha256('|'.join(str(part).lower() for part in parts).encode()).digest()
+    return int.from_bytes(digest[:8], 'big') % (1 << bits)
+
+def create_rpc_stand_in_app(chain_id=1, block_number=19_000_000, latency=0.0, max_batch_size=None):
+    """Local aiohttp app answering Ethereum JSON-RPC (single and batch requests)
+
+    ``latency`` delays every HTTP request; a large value stands in for a dead
+    endpoint that accepts connections but never answers in time. Batches
+    larger than ``max_batch_size`` are rejected with a single error object,
+    the way hosted RPC providers do.
+    """
+
+    state = {'requests': 0, 'calls': 0, 'block_number': block_number}
+
+    methods = {
+        'eth_chainId': lambda params: hex(chain_id),
+        'net_version': lambda params: str(chain_id),
+        'web3_clientVersion': lambda params: 'stand-in/1.0',
+        'eth_blockNumber': lambda params: hex(state['block_number']),
+        'eth_getBalance': lambda params: hex(stand_in_value(chain_id, 'balance', params[0], bits=72)),
+        'eth_getTransactionCount': lambda params: hex(stand_in_value(chain_id, 'nonce', params[0]) % 5000),
+        'eth_getCode': lambda params: '0x6080604052' if stand_in_value(chain_id, 'code', params[0]) % 4 == 0 else '0x',
+        'eth_call': lambda params: '0x' + format(
+            stand_in_value(chain_id, 'call', params[0].get('to'), params[0].get('data'), bits=64), '064x'
+        ),
+    }
+
+    def handle(call):
+        state['calls'] += 1
+        method = methods.get(call.get('method'))
+        if method is None:
+            return {'jsonrpc': '2.0', 'id': call.get('id'),
+                    'error': {'code': -32601, 'message': f"method not found: {call.get('method')}"}}
+        try:
+            return {'jsonrpc': '2.0', 'id': call.get('id'), 'result': method(call.get('params') or [])}
+        except RPCError as e:
+            return {'jsonrpc': '2.0', 'id': call.get('id'), 'error': {'code': e.code, 'message': e.message}}
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': call.get('id'), 'error': {'code': -32000, 'message': str(e)}}
+
+    async def rpc(request):
+        state['requests'] += 1
+        payload = await request.json()
+        if latency:
+            await asyncio.sleep(latency)
+
+        if isinstance(payload, list) and max_batch_size and len(payload) > max_batch_size:
+            return web.json_response({'jsonrpc': '2.0', 'id': None, 'error': {
+                'code': -32005, 'message': f"batch size {len(payload)} exceeds limit {max_batch_size}"
+            }})
+        if isinstance(payload, list):
+            return web.json_response([handle(call) for call in payload])
+        return web.json_response(handle(payload))
+
+    app = web.Application()
+    app['state'] = state
+    app['methods'] = methods
+    app.router.add_post('/', rpc)
+    return app
+
+class StandInServers:
+    """Run stand-in apps on a background event loop so blocking clients can call them"""
+
+    def __init__(self, apps):
+        self.apps = apps
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name='stand-in-servers', daemon=True)
+        self.runners = []
+        self.urls = []
+
+    def __enter__(self):
+        self.thread.start()
+        for app in self.apps:
+            runner, url = asyncio.run_coroutine_threadsafe(start_stand_in_server(app), self.loop).result()
+            self.runners.append(runner)
+            self.urls.append(url)
+        return self
+
+    def __exit__(self, *exc_info):
+        for runner in self.runners:
+            asyncio.run_coroutine_threadsafe(runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+
+def benchmark_chain_health(latency=0.25, dead_latency=30.0, timeout=2.0):
+    """Sequential is_connected() checks vs concurrent pooled checks against stand-in chains
+
+    Returns False unless both approaches agree that every chain except the dead
+    'base' stand-in is up.
+    """
+
+    print("="*60)
+    print("📊 CHAIN HEALTH CHECK BENCHMARK")
+    print("="*60)
+
+    chains = list(CHAIN_RPC_URLS)
+    apps = [
+        create_rpc_stand_in_app(chain_id=i + 1, latency=dead_latency if chain == 'base' else latency)
+        for i, chain in enumerate(chains)
+    ]
+
+    with StandInServers(apps) as servers:
+        urls = dict(zip(chains, servers.urls))
+        print(f"   {len(chains)} stand-in chains, {latency * 1000:.0f}ms RPC latency, "
+              f"'base' never answers (timeout {timeout:.0f}s)")
+
+        # Original approach: a provider per chain, checked one after another
+        print("\n🔄 Sequential is_connected():")
+        start_time = time.perf_counter()
+        sequential = {}
+        for chain, url in urls.items():
+            connected = sequential[chain] = make_web3(url, timeout=timeout).is_connected()
+            print(f"   {'✅' if connected else '❌'} {chain}")
+        sequential_time = time.perf_counter() - start_time
+
+        print("\n🔄 Concurrent checks over a pooled session:")
+        session = pooled_session(len(urls))
+        connections = {chain: make_web3(url, session, timeout=timeout) for chain, url in urls.items()}
+        start_time = time.perf_counter()
+        results = check_chains(connections, {chain: timeout for chain in urls})
+        concurrent_time = time.perf_counter() - start_time
+        print_chain_status(results)
+
+        # A second round reuses the pooled keep-alive connections
+        start_time = time.perf_counter()
+        check_chains({chain: w3 for chain, w3 in connections.items() if results[chain]['status'] == 'ok'}, {})
+        reuse_time = time.perf_counter() - start_time
+        session.close()
+
+    print(f"\n   Sequential: {sequential_time:.2f}s")
+    print(f"   Concurrent: {concurrent_time:.2f}s ({sequential_time / concurrent_time:.1f}x faster)")
+    print(f"   Re-check of healthy chains on pooled connections: {reuse_time * 1000:.0f}ms")
+
+    expected = {chain: chain != 'base' for chain in chains}
+    agree = sequential == expected and {chain: result['status'] == 'ok' for chain, result in results.items()} == expected
+    print(f"   {'✅' if agree else '❌'} Both report only 'base' as down: {agree}")
+    return agree
+
+def benchmark_batch_reads(num_addresses=50, latency=0.05, server_batch_limit=64):
+    """Per-call web3 reads vs JSON-RPC batches for balance, nonce and code of many addresses
+
+    Returns False unless the oversized batches were split and every account
+    came back in input order with the per-call values.
+    """
+
+    print("="*60)
+    print("📊 JSON-RPC BATCH READ BENCHMARK")
+    print("="*60)
+
+    rng = random.Random(42)
+    addresses = ['0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40)) for _ in range(num_addresses)]
+    app = create_rpc_stand_in_app(latency=latency, max_batch_size=server_batch_limit)
+
+    with StandInServers([app]) as servers:
+        url = servers.urls[0]
+        print(f"   {num_addresses} addresses x 3 calls, {latency * 1000:.0f}ms RPC latency, "
+              f"server batch limit {server_batch_limit}")
+
+        # One round trip per call through web3
+        from web3 import Web3
+
+        w3 = make_web3(url, pooled_session(1))
+        start_time = time.perf_counter()
+        expected = []
+        for address in addresses:
+            checksum = Web3.to_checksum_address(address)
+            expected.append((
+                w3.eth.get_balance(checksum),
+                w3.eth.get_transaction_count(checksum),
+                len(w3.eth.get_code(checksum)) > 0
+            ))
+        per_call_time = time.perf_counter() - start_time
+        per_call_requests = app['state']['requests']
+
+        async def read_batched():
+            async with MarketDataClient() as client:
+                # Larger than the server allows, so the first batches get split
+                reader = OnChainReader(client, {'stand-in': url}, max_batch_size=100)
+                accounts = await reader.read_accounts('stand-in', addresses)
+                return accounts, reader.stats
+
+        start_time = time.perf_counter()
+        accounts, stats = asyncio.run(read_batched())
+        batch_time = time.perf_counter() - start_time
+        batch_requests = app['state']['requests'] - per_call_requests
+
+    matches = len(accounts) == len(expected) and all(
+        (account['balance'], account['nonce'], account['is_contract']) == row
+        for account, row in zip(accounts, expected)
+    )
+    print(f"   Per-call: {per_call_time:.2f}s, {per_call_requests} HTTP requests")
+    print(f"   Batched:  {batch_time:.2f}s, {batch_requests} HTTP requests "
+          f"({stats['batches']} batches sent, {stats['splits']} splits)")
+    print(f"   Speedup: {per_call_time / batch_time:.1f}x")
+    print(f"   {'✅' if matches else '❌'} Results match in order: {matches}")
+    if not stats['splits']:
+        print("   ❌ No batch was split; the server batch limit was not exercised")
+    return matches and stats['splits'] > 0
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == 'batch':
+        sys.exit(0 if benchmark_batch_reads() else 1)
+    else:
+        sys.exit(0 if benchmark_chain_health() else 1)
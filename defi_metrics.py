@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+
+"""
+DeFi Metrics Index
+In-memory lookups from tokens to TVL change, pool APYs and liquidity depth,
+built from the DeFiLlama /protocols and /pools snapshots and updated
+incrementally as records change between ticks
+"""
+
+import math
+import sys
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+import numpy as np
+
+# CoinGecko ids whose pools trade under a different (often wrapped) symbol
+TOKEN_SYMBOLS = {
+    'bitcoin': ('WBTC', 'BTC'),
+    'ethereum': ('WETH', 'ETH', 'STETH'),
+    'solana': ('SOL',),
+    'chainlink': ('LINK',),
+}
+
+class DeFiMetricsIndex:
+    """Token aggregates over the latest protocol and pool snapshots
+
+    Every pool keeps the contribution it last added to the symbol
+    aggregates, so ``update`` only touches records that are new, changed or
+    gone. Lookups are plain dict reads.
+    """
+
+    def __init__(self):
+        self.protocols = {}  # name -> record fields we read
+        self.pools = {}  # pool id -> (symbols, chain, tvl, apy)
+        self.protocols_by_gecko_id = {}
+        self.symbol_stats = defaultdict(lambda: [0.0, 0.0, 0])  # symbol -> [tvl, tvl * apy, pools]
+        self.last_sources = (None, None)
+        self.stats = {'updates': 0, 'changed': 0, 'skipped': 0}
+
+    @staticmethod
+    def number(value):
+        return float(value) if isinstance(value, (int, float)) and math.isfinite(value) else 0.0
+
+    @staticmethod
+    def pool_apy(pool):
+        if pool.get('apy') is not None:
+            return DeFiMetricsIndex.number(pool['apy'])
+        return DeFiMetricsIndex.number(pool.get('apyBase')) + DeFiMetricsIndex.number(pool.get('apyReward'))
+
+    def add_pool(self, entry, sign):
+        symbols, _, tvl, apy = entry
+        for symbol in symbols:
+            stats = self.symbol_stats[symbol]
+            stats[0] += sign * tvl
+            stats[1] += sign * tvl * apy
+            stats[2] += sign
+            if stats[2] == 0:
+                # Running float sums leave rounding residue behind; an empty symbol has none
+                del self.symbol_stats[symbol]
+
+    def update_protocols(self, protocols: List[Dict]):
+        seen = set()
+        for protocol in protocols:
+            name = protocol.get('name')
+            if not name:
+                continue
+            seen.add(name)
+            entry = {
+                'gecko_id': protocol.get('gecko_id'),
+                'symbol': (protocol.get('symbol') or '').upper(),
+                'chain': protocol.get('chain') or 'Unknown',
+                'tvl': self.number(protocol.get('tvl')),
+                'change_1d': self.number(protocol.get('change_1d')),
+                'change_7d': self.number(protocol.get('change_7d')),
+            }
+            old = self.protocols.get(name)
+            if old == entry:
+                self.stats['skipped'] += 1
+                continue
+
+            self.stats['changed'] += 1
+            if old is not None:
+                self.remove_protocol(name)
+            self.protocols[name] = entry
+            if entry['gecko_id']:
+                self.protocols_by_gecko_id[entry['gecko_id']] = entry
+
+        for name in [name for name in self.protocols if name not in seen]:
+            self.stats['changed'] += 1
+            self.remove_protocol(name)
+
+    def remove_protocol(self, name):
+        entry = self.protocols.pop(name)
+        if self.protocols_by_gecko_id.get(entry['gecko_id']) is entry:
+            del self.protocols_by_gecko_id[entry['gecko_id']]
+
+    def update_pools(self, pools: List[Dict]):
+        seen = set()
+        for pool in pools:
+            pool_id = pool.get('pool') or (pool.get('project'), pool.get('chain'), pool.get('symbol'))
+            seen.add(pool_id)
+            entry = (
+                tuple(symbol.strip().upper() for symbol in (pool.get('symbol') or '').split('-') if symbol.strip()),
+                pool.get('chain') or 'Unknown',
+                self.number(pool.get('tvlUsd')),
+                self.pool_apy(pool)
+            )
+            old = self.pools.get(pool_id)
+            if old == entry:
+                self.stats['skipped'] += 1
+                continue
+
+            self.stats['changed'] += 1
+            if old is not None:
+                self.add_pool(old, -1)
+            self.pools[pool_id] = entry
+            self.add_pool(entry, 1)
+
+        for pool_id in [pool_id for pool_id in self.pools if pool_id not in seen]:
+            self.stats['changed'] += 1
+            self.add_pool(self.pools.pop(pool_id), -1)
+
+    def update(self, protocols: List[Dict], pools: List[Dict]):
+        """Apply a new snapshot; the same snapshot objects again cost nothing"""
+
+        if self.last_sources[0] is protocols and self.last_sources[1] is pools:
+            return
+        self.last_sources = (protocols, pools)
+        self.stats['updates'] += 1
+        self.update_protocols(protocols or [])
+        self.update_pools(pools or [])
+
+    def symbols_for(self, token: str) -> tuple:
+        protocol = self.protocols_by_gecko_id.get(token)
+        if token in TOKEN_SYMBOLS:
+            return TOKEN_SYMBOLS[token]
+        if protocol is not None and protocol['symbol']:
+            return (protocol['symbol'],)
+        return (token.upper(),)
+
+    def lookup(self, token: str) -> Dict:
+        """TVL change, pool APY and liquidity depth for a CoinGecko token id"""
+
+        protocol = self.protocols_by_gecko_id.get(token)
+        pool_tvl = pool_apy_tvl = 0.0
+        pool_count = 0
+        for symbol in self.symbols_for(token):
+            stats = self.symbol_stats.get(symbol)
+            if stats is not None:
+                pool_tvl += stats[0]
+                pool_apy_tvl += stats[1]
+                pool_count += stats[2]
+
+        return {
+            'protocol_tvl': protocol['tvl'] if protocol else None,
+            'tvl_change_1d': protocol['change_1d'] if protocol else None,
+            'tvl_change_7d': protocol['change_7d'] if protocol else None,
+            'chain': protocol['chain'] if protocol else None,
+            'pool_tvl': pool_tvl,
+            'pool_apy': pool_apy_tvl / pool_tvl if pool_count > 0 and pool_tvl > 0 else None,
+            'pool_count': pool_count,
+        }
+
+    @staticmethod
+    def score(metrics: Dict) -> float:
+        """DeFi score in [-0.5, 0.5] from TVL trend, pool yield and liquidity depth"""
+
+        # NumPy math so this matches scores() bit for bit
+        score = 0.0
+        if metrics['tvl_change_1d'] is not None:
+            score += 0.25 * np.tanh(metrics['tvl_change_1d'] / 10)
+        if metrics['pool_apy'] is not None:
+            score += 0.15 * np.tanh(metrics['pool_apy'] / 20)
+        if metrics['pool_count']:
+            # $1M of pool liquidity scores -0.1, $1B and more +0.1
+            depth = (np.log10(max(metrics['pool_tvl'], 1.0)) - 7.5) / 1.5
+            score += 0.1 * max(-1.0, min(1.0, depth))
+        return float(score)
+
+    @staticmethod
+    def scores(tvl_change_1d, pool_apy, pool_tvl, pool_count) -> np.ndarray:
+        """score() over NumPy columns; missing TVL change or APY is NaN"""
+
+        score = np.zeros(len(pool_tvl))
+        score += np.where(np.isnan(tvl_change_1d), 0.0, 0.25 * np.tanh(tvl_change_1d / 10))
+        score += np.where(np.isnan(pool_apy), 0.0, 0.15 * np.tanh(pool_apy / 20))
+        depth = (np.log10(np.maximum(pool_tvl, 1.0)) - 7.5) / 1.5
+        score += np.where(pool_count != 0, 0.1 * np.clip(depth, -1.0, 1.0), 0.0)
+        return score
+
+def scan_metrics(token: str, protocols: List[Dict], pools: List[Dict]) -> Dict:
+    """The same metrics computed by scanning the snapshot lists (reference for the index)"""
+
+    protocol = next((p for p in protocols if p.get('gecko_id') == token), None)
+    if token in TOKEN_SYMBOLS:
+        symbols = TOKEN_SYMBOLS[token]
+    elif protocol is not None and protocol.get('symbol'):
+        symbols = ((protocol.get('symbol') or '').upper(),)
+    else:
+        symbols = (token.upper(),)
+
+    pool_tvl = pool_apy_tvl = 0.0
+    pool_count = 0
+    for pool in pools:
+        pool_symbols = {symbol.strip().upper() for symbol in (pool.get('symbol') or '').split('-')}
+        for symbol in symbols:
+            if symbol in pool_symbols:
+                tvl = DeFiMetricsIndex.number(pool.get('tvlUsd'))
+                pool_tvl += tvl
+                pool_apy_tvl += tvl * DeFiMetricsIndex.pool_apy(pool)
+                pool_count += 1
+
+    number = DeFiMetricsIndex.number
+    return {
+        'protocol_tvl': number(protocol.get('tvl')) if protocol else None,
+        'tvl_change_1d': number(protocol.get('change_1d')) if protocol else None,
+        'tvl_change_7d': number(protocol.get('change_7d')) if protocol else None,
+        'chain': (protocol.get('chain') or 'Unknown') if protocol else None,
+        'pool_tvl': pool_tvl,
+        'pool_apy': pool_apy_tvl / pool_tvl if pool_count > 0 and pool_tvl > 0 else None,
+        'pool_count': pool_count,
+    }
+
+def benchmark_defi_index(num_protocols=500, num_pools=5000, num_tokens=1000, ticks=20, churn=0.02):
+    """Per-tick DeFi scoring: scanning the snapshot per token vs the incremental index"""
+
+    import random
+    from market_data_client import POOL_FIELDS, PROTOCOL_FIELDS, generate_stand_in_payloads
+
+    print("="*60)
+    print("📊 DEFI METRICS INDEX BENCHMARK")
+    print("="*60)
+
+    rng = random.Random(42)
+    raw_protocols, raw_pools = generate_stand_in_payloads(num_protocols, num_pools)
+    protocols = [{field: p[field] for field in PROTOCOL_FIELDS if field in p} for p in raw_protocols]
+    pools = [{field: p[field] for field in POOL_FIELDS if field in p} for p in raw_pools['data']]
+    tokens = [f'protocol-{i % num_protocols}' for i in range(num_tokens)] + list(TOKEN_SYMBOLS)
+
+    index = DeFiMetricsIndex()
+    scan_time = index_time = update_time = 0.0
+    mismatches = 0
+
+    for tick in range(ticks):
+        # A few records change between ticks, like real snapshots
+        protocols = [dict(p, tvl=p['tvl'] * rng.uniform(0.99, 1.01)) if rng.random() < churn else p for p in protocols]
+        pools = [dict(p, apy=rng.uniform(0, 30)) if rng.random() < churn else p for p in pools]
+
+        start_time = time.perf_counter()
+        index.update(protocols, pools)
+        update_time += time.perf_counter() - start_time
+        if tick == 0:
+            # Count incremental updates only, not the initial build
+            index.stats = dict.fromkeys(index.stats, 0)
+
+        start_time = time.perf_counter()
+        indexed = [index.score(index.lookup(token)) for token in tokens]
+        index_time += time.perf_counter() - start_time
+
+        if tick < 3:
+            start_time = time.perf_counter()
+            scanned = [index.score(scan_metrics(token, protocols, pools)) for token in tokens]
+            scan_time += time.perf_counter() - start_time
+            mismatches += sum(abs(a - b) > 1e-9 for a, b in zip(indexed, scanned))
+
+    scan_per_tick = scan_time / min(ticks, 3)
+    index_per_tick = (index_time + update_time) / ticks
+    print(f"   {len(protocols)} protocols, {len(pools)} pools, {len(tokens)} tokens, {churn:.0%} churn per tick")
+    print(f"   Scan per token:  {scan_per_tick * 1000:8.1f} ms/tick")
+    print(f"   Index:           {index_per_tick * 1000:8.1f} ms/tick "
+          f"(update {update_time / ticks * 1000:.1f} ms, lookups {index_time / ticks * 1000:.1f} ms)")
+    print(f"   Speedup: {scan_per_tick / index_per_tick:.0f}x")
+    print(f"   Records changed per incremental update: {index.stats['changed'] / max(index.stats['updates'], 1):.0f} "
+          f"of {len(protocols) + len(pools)}")
+    print(f"   Scores match the scan: {mismatches == 0}")
+
+    # Regression: a symbol whose pools all disappear must look exactly like the scan (no float residue)
+    emptied = {'WETH', 'ETH', 'STETH'}
+    for i in range(50):
+        index.update(protocols, pools + [{'pool': f'weth-usdc-{i}', 'symbol': 'WETH-USDC', 'chain': 'Ethereum',
+                                          'tvlUsd': rng.uniform(1e5, 1e8), 'apy': rng.uniform(-60, 60)}])
+    pools = [p for p in pools if not emptied & {s.strip().upper() for s in (p.get('symbol') or '').split('-')}]
+    index.update(protocols, pools)
+    residue_free = index.lookup('ethereum') == scan_metrics('ethereum', protocols, pools) and \
+        not emptied & set(index.symbol_stats)
+    print(f"   Emptied symbols match the scan: {residue_free}")
+    return mismatches == 0 and residue_free
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark_defi_index() else 1)
@@ -0,0 +1,708 @@
+#!/usr/bin/env python3
+
+"""
+Connection-Pooled Market Data Client
+One long-lived aiohttp session shared by the trading bot and the data collector
+Includes a local stand-in server that mimics the DeFiLlama and CoinGecko endpoints
+and a streaming parser that reads only the first N records of large JSON arrays
+"""
+
+import asyncio
+import codecs
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from urllib.parse import urlsplit
+
+import aiohttp
+from aiohttp import web
+
+# Fields the signal and dataset code actually read from DeFiLlama
+PROTOCOL_FIELDS = ('name', 'symbol', 'gecko_id', 'chain', 'chains', 'category', 'tvl', 'change_1d', 'change_7d')
+POOL_FIELDS = ('pool', 'chain', 'project', 'symbol', 'tvlUsd', 'apy', 'apyBase', 'apyReward')
+
+class JSONArrayStreamParser:
+    """Incrementally decode the items of a JSON array nested under ``path``
+
+    Text is fed in chunks; complete items are returned as soon as they are
+    decoded, and parsing stops once ``limit`` items have been read so the rest
+    of the payload never has to be downloaded or parsed. When ``fields`` is
+    given, only those keys of each object item are kept.
+    """
+
+    WHITESPACE = ' \t\n\r'
+
+    def __init__(self, path: Sequence[str] = (), limit: Optional[int] = None,
+                 fields: Optional[Sequence[str]] = None):
+        self.path = list(path)
+        self.limit = limit
+        self.fields = fields
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.pos = 0
+        self.state = 'value'
+        self.count = 0
+        self.done = limit == 0
+
+    def skip_whitespace(self) -> bool:
+        """Advance past whitespace, returning False when the buffer runs out"""
+
+        while self.pos < len(self.buffer) and self.buffer[self.pos] in self.WHITESPACE:
+            self.pos += 1
+        return self.pos < len(self.buffer)
+
+    def decode_value(self):
+        """Decode one complete value at pos, or return None when more text is needed"""
+
+        try:
+            value, end = self.decoder.raw_decode(self.buffer, self.pos)
+        except json.JSONDecodeError:
+            return None
+
+        # A number is only complete once the delimiter after it has arrived
+        rest = end
+        while rest < len(self.buffer) and self.buffer[rest] in self.WHITESPACE:
+            rest += 1
+        if rest == len(self.buffer) or self.buffer[rest] not in ',:]}':
+            return None
+
+        self.pos = end
+        return (value,)
+
+    def project(self, item):
+        if self.fields is None or not isinstance(item, dict):
+            return item
+        return {field: item[field] for field in self.fields if field in item}
+
+    def feed(self, text: str) -> List:
+        """Feed the next chunk of text and return the items it completed"""
+
+        self.buffer = self.buffer[self.pos:] + text
+        self.pos = 0
+        items = []
+
+        while not self.done and self.skip_whitespace():
+            char = self.buffer[self.pos]
+
+            if self.state == 'value':
+                # Descend into the object holding the array, or enter the array itself
+                expected = '{' if self.path else '['
+                if char != expected:
+                    raise ValueError(f"Expected '{expected}' at JSON path {self.path}, got {char!r}")
+                self.pos += 1
+                self.state = 'key' if self.path else 'item'
+
+            elif self.state == 'key':
+                if char == ',':
+                    self.pos += 1
+                    continue
+                if char == '}':
+                    raise ValueError(f"Key {self.path[0]!r} not found in JSON payload")
+
+                start = self.pos
+                decoded = self.decode_value()
+                if decoded is None or not self.skip_whitespace():
+                    self.pos = start
+                    break
+                if self.buffer[self.pos] != ':':
+                    raise ValueError(f"Expected ':' after key {decoded[0]!r}")
+                self.pos += 1
+
+                if decoded[0] == self.path[0]:
+                    self.path.pop(0)
+                    self.state = 'value'
+                else:
+                    self.state = 'skip'
+
+            elif self.state == 'skip':
+                # Sibling values before the array (e.g. "status") are decoded and dropped
+                if self.decode_value() is None:
+                    break
+                self.state = 'key'
+
+            else:
+                if char == ',':
+                    self.pos += 1
+                    continue
+                if char == ']':
+                    self.done = True
+                    break
+
+                decoded = self.decode_value()
+                if decoded is None:
+                    break
+                items.append(self.project(decoded[0]))
+                self.count += 1
+                if self.limit is not None and self.count >= self.limit:
+                    self.done = True
+
+        return items
+
+    def close(self):
+        """Check that the stream ended on a complete array"""
+
+        if not self.done:
+            raise ValueError("JSON payload ended before the array was complete")
+
+# Requests per second and burst size allowed per API host
+DEFAULT_RATE_LIMITS = {
+    'api.coingecko.com': (0.5, 5),  # Public tier: ~30 calls/minute
+    'api.llama.fi': (5, 10),
+    'yields.llama.fi': (5, 10),
+}
+
+class TokenBucket:
+    """Token-bucket rate limiter shared by all requests to one host"""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.lock = asyncio.Lock()
+
+    def try_acquire(self) -> float:
+        """Take a token if one is available; otherwise return the seconds to wait"""
+
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    async def acquire(self):
+        """Wait for a token; waiters are served in arrival order"""
+
+        async with self.lock:
+            while True:
+                wait = self.try_acquire()
+                if wait == 0.0:
+                    return
+                await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Stop handing out tokens, e.g. after the host answered 429 with Retry-After"""
+
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0.0
+        self.updated = self.paused_until  # no refill accrues while paused
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given in seconds or as an HTTP date"""
+
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+class MarketDataClient:
+    """Keep-alive HTTP client with per-host connection limits, rate limits, timeouts and retries"""
+
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self, limit=64, limit_per_host=8, timeout=30, connect_timeout=10,
+                 keepalive_timeout=60, max_retries=3, backoff_base=0.5, backoff_max=10,
+                 rate_limits: Optional[Dict[str, Tuple[float, float]]] = None, max_retry_after=120):
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.timeout = aiohttp.ClientTimeout(total=timeout, connect=connect_timeout)
+        self.keepalive_timeout = keepalive_timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_retry_after = max_retry_after
+        self.session = None
+
+        # Per-host token buckets
+        self.rate_limits = DEFAULT_RATE_LIMITS if rate_limits is None else rate_limits
+        self.buckets = {}
+
+        # Request statistics
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'throttled': 0}
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Create the pooled session on first use (it must live on the running loop)"""
+
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=300
+            )
+            self.session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+
+        return self.session
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff"""
+
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def bucket_for(self, url: str) -> Optional[TokenBucket]:
+        """Token bucket for the URL's host, or None when the host is not rate limited"""
+
+        host = urlsplit(url).hostname
+        if host not in self.rate_limits:
+            return None
+        if host not in self.buckets:
+            self.buckets[host] = TokenBucket(*self.rate_limits[host])
+        return self.buckets[host]
+
+    async def request(self, url: str, params: Optional[Dict], read, method: str = 'GET', json_body=None):
+        """GET ``url`` and return ``await read(response)``, retrying transient failures with jittered backoff
+
+        ``method``/``json_body`` send a JSON POST instead; only use them for
+        idempotent calls such as read-only JSON-RPC, since they are retried too.
+
+        Requests wait for their host's token bucket, and a 429/503 carrying
+        Retry-After pauses the whole host for that long instead of backing off.
+        """
+
+        session = await self.get_session()
+        bucket = self.bucket_for(url)
+
+        for attempt in range(self.max_retries + 1):
+            if bucket is not None:
+                await bucket.acquire()
+
+            self.stats['requests'] += 1
+            delay = None
+            try:
+                async with session.request(method, url, params=params, json=json_body) as response:
+                    if response.status not in self.RETRY_STATUSES:
+                        response.raise_for_status()
+                        return await read(response)
+
+                    if response.status == 429:
+                        self.stats['throttled'] += 1
+
+                    if attempt == self.max_retries:
+                        self.stats['failures'] += 1
+                        response.raise_for_status()
+
+                    retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                    if retry_after is not None:
+                        delay = min(retry_after, self.max_retry_after)
+                        if bucket is not None:
+                            bucket.pause(delay)
+
+            except (aiohttp.ClientConnectionError, aiohttp.ClientPayloadError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    self.stats['failures'] += 1
+                    raise
+
+            self.stats['retries'] += 1
+            await asyncio.sleep(self.backoff_delay(attempt) if delay is None else delay)
+
+    async def get_json(self, url: str, params: Optional[Dict] = None):
+        """GET a whole JSON document"""
+
+        return await self.request(url, params, lambda response: response.json())
+
+    async def post_json(self, url: str, payload):
+        """POST a JSON payload and return the whole JSON response"""
+
+        return await self.request(url, None, lambda response: response.json(content_type=None),
+                                  method='POST', json_body=payload)
+
+    async def get_json_items(self, url: str, path: Sequence[str] = (), limit: Optional[int] = None,
+                             fields: Optional[Sequence[str]] = None, params: Optional[Dict] = None,
+                             chunk_size: int = 65536) -> List:
+        """GET the first ``limit`` items of a JSON array, streaming and projecting as it downloads
+
+        The connection is dropped as soon as enough items have been read, so
+        large payloads like DeFiLlama /pools are never fully downloaded.
+        """
+
+        async def read(response):
+            parser = JSONArrayStreamParser(path, limit, fields)
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            items = []
+
+            async for chunk in response.content.iter_chunked(chunk_size):
+                items.extend(parser.feed(decoder.decode(chunk)))
+                if parser.done:
+                    break
+
+            parser.close()
+            return items
+
+        return await self.request(url, params, read)
+
+    async def close(self):
+        """Close the pooled session and its connections"""
+
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def __aenter__(self):
+        await self.get_session()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+def generate_stand_in_payloads(num_protocols=500, num_pools=2000, seed=42):
+    """Build /protocols and /pools payloads shaped like DeFiLlama's, including the fields we never read"""
+
+    rng = random.Random(seed)
+    chains = ['Ethereum', 'Arbitrum', 'Solana', 'Base', 'Polygon', 'Optimism']
+
+    protocols = []
+    for i in range(num_protocols):
+        tvl = rng.uniform(1e6, 1e10)
+        protocols.append({
+            'id': str(i),
+            'name': f'Protocol {i}',
+            'address': '0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40)),
+            'symbol': f'P{i}',
+            'url': f'https://protocol-{i}.example',
+            'description': 'Decentralized protocol for lending, trading and yield. ' * 3,
+            'chain': rng.choice(chains),
+            'logo': f'https://icons.llama.fi/protocol-{i}.png',
+            'audits': str(rng.randint(0, 3)),
+            'gecko_id': f'protocol-{i}',
+            'cmcId': str(rng.randint(1, 30000)),
+            'category': rng.choice(['Dexes', 'Lending', 'Yield', 'Bridge', 'Liquid Staking']),
+            'chains': rng.sample(chains, rng.randint(1, 4)),
+            'module': f'protocol-{i}/index.js',
+            'twitter': f'protocol{i}',
+            'audit_links': [f'https://audits.example/{i}/{j}' for j in range(rng.randint(0, 3))],
+            'listedAt': 1600000000 + i,
+            'slug': f'protocol-{i}',
+            'tvl': tvl,
+            'chainTvls': {chain: tvl / 4 for chain in chains[:4]},
+            'change_1h': rng.uniform(-2, 2),
+            'change_1d': rng.uniform(-10, 10),
+            'change_7d': rng.uniform(-25, 25),
+            'mcap': tvl * rng.uniform(0.1, 3),
+        })
+
+    pools = {
+        'status': 'success',
+        'data': [
+            {
+                'chain': rng.choice(chains),
+                'project': f'protocol-{i % num_protocols}',
+                'symbol': rng.choice(['WETH-USDC', 'WBTC', 'ETH', 'SOL', 'LINK']),
+                'tvlUsd': rng.uniform(1e4, 1e9),
+                'apyBase': rng.uniform(0, 20),
+                'apyReward': rng.uniform(0, 20),
+                'apy': rng.uniform(0, 40),
+                'rewardTokens': ['0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40))],
+                'pool': f'{i:08x}-0000-4000-8000-000000000000',
+                'apyPct1D': rng.uniform(-1, 1),
+                'apyPct7D': rng.uniform(-5, 5),
+                'apyPct30D': rng.uniform(-10, 10),
+                'stablecoin': rng.random() < 0.3,
+                'ilRisk': rng.choice(['yes', 'no']),
+                'exposure': rng.choice(['single', 'multi']),
+                'predictions': {
+                    'predictedClass': rng.choice(['Stable/Up', 'Down']),
+                    'predictedProbability': rng.randint(50, 100),
+                    'binnedConfidence': rng.randint(1, 3),
+                },
+                'poolMeta': None,
+                'mu': rng.uniform(0, 30),
+                'sigma': rng.uniform(0, 5),
+                'count': rng.randint(1, 1000),
+                'outlier': False,
+                'underlyingTokens': ['0x' + ''.join(rng.choice('0123456789abcdef') for _ in range(40))],
+                'il7d': None,
+                'apyBase7d': None,
+                'apyMean30d': rng.uniform(0, 30),
+                'volumeUsd1d': rng.uniform(0, 1e8),
+                'volumeUsd7d': rng.uniform(0, 7e8),
+                'apyBaseInception': None,
+            }
+            for i in range(num_pools)
+        ]
+    }
+
+    return protocols, pools
+
+def create_stand_in_app(num_protocols=500, num_pools=2000, latency=0.0, rate_limit=None):
+    """Local aiohttp app that mimics the DeFiLlama and CoinGecko endpoints we use
+
+    ``rate_limit`` is an optional (requests per second, burst) pair enforced
+    like a real provider: excess requests get 429 with a Retry-After header.
+    """
+
+    rng = random.Random(42)
+    protocols, pools = generate_stand_in_payloads(num_protocols, num_pools)
+    server_bucket = TokenBucket(*rate_limit) if rate_limit else None
+
+    @web.middleware
+    async def enforce_rate_limit(request, handler):
+        if server_bucket is not None:
+            wait = server_bucket.try_acquire()
+            if wait > 0:
+                return web.json_response(
+                    {'status': {'error_code': 429, 'error_message': 'Rate limit exceeded'}},
+                    status=429,
+                    headers={'Retry-After': f"{wait:.3f}"}
+                )
+        return await handler(request)
+
+    async def delay():
+        if latency:
+            await asyncio.sleep(latency)
+
+    async def get_protocols(request):
+        await delay()
+        return web.json_response(protocols)
+
+    async def get_pools(request):
+        await delay()
+        return web.json_response(pools)
+
+    async def get_simple_price(request):
+        await delay()
+        ids = [token for token in request.query.get('ids', '').split(',') if token]
+        return web.json_response({
+            token: {
+                'usd': rng.uniform(0.1, 50000),
+                'usd_market_cap': rng.uniform(1e7, 1e12),
+                'usd_24h_vol': rng.uniform(1e6, 1e10),
+                'usd_24h_change': rng.uniform(-10, 10),
+            }
+            for token in ids
+        })
+
+    async def get_market_chart(request):
+        await delay()
+        days = int(request.query.get('days', 1))
+        end = int(time.time() * 1000)
+        points = days * 24
+        timestamps = [end - (points - i) * 3_600_000 for i in range(points)]
+        price = rng.uniform(1, 50000)
+        prices = []
+        for ts in timestamps:
+            price *= 1 + rng.gauss(0, 0.01)
+            prices.append([ts, price])
+        return web.json_response({
+            'prices': prices,
+            'total_volumes': [[ts, rng.uniform(1e6, 1e10)] for ts in timestamps],
+            'market_caps': [[ts, price * 1e7] for ts, price in prices],
+        })
+
+    app = web.Application(middlewares=[enforce_rate_limit])
+    app.router.add_get('/protocols', get_protocols)
+    app.router.add_get('/pools', get_pools)
+    app.router.add_get('/api/v3/simple/price', get_simple_price)
+    app.router.add_get('/api/v3/coins/{id}/market_chart', get_market_chart)
+    return app
+
+async def start_stand_in_server(app, host='127.0.0.1', port=0):
+    """Start the stand-in app and return (runner, base_url)"""
+
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://{host}:{port}"
+
+async def benchmark_connection_pooling(requests_count=200):
+    """Compare a fresh session per request against the pooled client; False if their responses differ"""
+
+    print("="*60)
+    print("📊 CONNECTION POOLING BENCHMARK")
+    print("="*60)
+
+    runner, base_url = await start_stand_in_server(create_stand_in_app(num_protocols=50, num_pools=100))
+    url = f"{base_url}/api/v3/simple/price"
+    params = {'ids': 'bitcoin,ethereum', 'vs_currencies': 'usd'}
+
+    try:
+        start_time = time.time()
+        for _ in range(requests_count):
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url, params=params) as response:
+                    await response.json()
+        per_call_time = time.time() - start_time
+
+        # Prices are random per request; /protocols is fixed, so the payloads must be equal
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{base_url}/protocols") as response:
+                expected = await response.json()
+
+        async with MarketDataClient() as client:
+            start_time = time.time()
+            for _ in range(requests_count):
+                await client.get_json(url, params=params)
+            pooled_time = time.time() - start_time
+            pooled = await client.get_json(f"{base_url}/protocols")
+
+        print(f"   Requests: {requests_count}")
+        print(f"   Session per call: {per_call_time:.2f}s ({requests_count / per_call_time:.0f} req/s)")
+        print(f"   Pooled client:    {pooled_time:.2f}s ({requests_count / pooled_time:.0f} req/s)")
+        print(f"   Speedup: {per_call_time / pooled_time:.1f}x")
+        print(f"   {'✅' if pooled == expected else '❌'} Pooled responses match: {pooled == expected}")
+        return pooled == expected
+    finally:
+        await runner.cleanup()
+
+async def benchmark_rate_limited_history(num_tokens=60, server_rate=(20, 5)):
+    """Fetch market_chart histories from a rate-limited stand-in, with and without client-side scheduling
+
+    Returns False unless the token-bucket run fetched every history and retried
+    each 429 exactly once (after its Retry-After pause).
+    """
+
+    print("="*60)
+    print("📊 RATE-LIMITED HISTORY BENCHMARK")
+    print("="*60)
+
+    runner, base_url = await start_stand_in_server(create_stand_in_app(rate_limit=server_rate))
+    host = urlsplit(base_url).hostname
+    tokens = [f'token-{i}' for i in range(num_tokens)]
+    print(f"   Server limit: {server_rate[0]} req/s (burst {server_rate[1]}), tokens: {num_tokens}")
+
+    async def fetch_all(client):
+        return await asyncio.gather(*(
+            client.get_json(f"{base_url}/api/v3/coins/{token}/market_chart",
+                            params={'vs_currency': 'usd', 'days': 1})
+            for token in tokens
+        ), return_exceptions=True)
+
+    try:
+        for label, rate_limits in (('Unscheduled', {}), ('Token bucket', {host: server_rate})):
+            async with MarketDataClient(rate_limits=rate_limits, max_retries=5) as client:
+                start_time = time.time()
+                results = await fetch_all(client)
+                elapsed = time.time() - start_time
+
+            succeeded = sum(1 for result in results if not isinstance(result, Exception))
+            print(f"   {label + ':':<14} {succeeded}/{num_tokens} ok in {elapsed:.2f}s "
+                  f"({succeeded / elapsed:.1f} histories/s), {client.stats['requests']} requests, "
+                  f"{client.stats['throttled']} throttled")
+
+        scheduled = succeeded == num_tokens and client.stats['requests'] == num_tokens + client.stats['throttled']
+        print(f"   {'✅' if scheduled else '❌'} Token bucket fetched every history, one retry per 429: {scheduled}")
+        return scheduled
+    finally:
+        await runner.cleanup()
+
+def parse_fixture_worker(mode: str, path: str, limit: int):
+    """Parse a recorded /pools fixture in this process and print parse time and peak RSS"""
+
+    start_time = time.perf_counter()
+
+    if mode == 'idle':
+        pools = []
+    elif mode == 'full':
+        with open(path, encoding='utf-8') as f:
+            pools = json.load(f)['data'][:limit]
+    else:
+        parser = JSONArrayStreamParser(('data',), limit, POOL_FIELDS)
+        pools = []
+        with open(path, encoding='utf-8') as f:
+            while not parser.done:
+                chunk = f.read(65536)
+                if not chunk:
+                    break
+                pools.extend(parser.feed(chunk))
+        parser.close()
+
+    parse_time = time.perf_counter() - start_time
+    try:
+        import resource  # POSIX only; kept out of module scope so the client imports on Windows
+        # ru_maxrss is in bytes on macOS and in KB elsewhere
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+    except ImportError:
+        peak_rss_mb = None
+    print(json.dumps({'records': len(pools), 'parse_time': parse_time, 'peak_rss_mb': peak_rss_mb}))
+
+async def record_fixture(path: str, url: str = 'https://yields.llama.fi/pools'):
+    """Record a live DeFiLlama /pools payload for the parsing benchmark"""
+
+    async with MarketDataClient(timeout=120) as client:
+        payload = await client.get_json(url)
+
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f)
+    print(f"✅ Recorded {len(payload['data'])} pools to {path}")
+
+def benchmark_pools_parsing(fixture_path: Optional[str] = None, limit: int = 100):
+    """Compare full json parsing against the streaming parser on a recorded /pools payload"""
+
+    print("="*60)
+    print("📊 /POOLS PARSING BENCHMARK")
+    print("="*60)
+
+    temp_path = None
+    if fixture_path is None:
+        # No recorded payload given: write a synthetic one of realistic size
+        _, pools = generate_stand_in_payloads(num_protocols=500, num_pools=20000)
+        fd, temp_path = tempfile.mkstemp(suffix='.json')
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            json.dump(pools, f)
+        fixture_path = temp_path
+
+    try:
+        print(f"   Fixture: {fixture_path} ({os.path.getsize(fixture_path) / 1e6:.1f} MB)")
+        print(f"   Records kept: {limit}")
+
+        # Each mode runs in a fresh interpreter so peak RSS is not shared
+        results = {}
+        for mode in ('idle', 'full', 'stream'):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), 'parse-worker', mode, fixture_path, str(limit)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+        rss = lambda mode: 'n/a' if results[mode]['peak_rss_mb'] is None else f"{results[mode]['peak_rss_mb']:.1f} MB"
+        print(f"   Interpreter baseline: peak RSS {rss('idle')}")
+        for mode, label in (('full', 'Full parse'), ('stream', 'Streaming')):
+            print(f"   {label + ':':<12} {results[mode]['parse_time'] * 1000:8.1f}ms, peak RSS {rss(mode)}")
+
+        print(f"   Speedup: {results['full']['parse_time'] / results['stream']['parse_time']:.1f}x")
+        return results
+    finally:
+        if temp_path:
+            os.remove(temp_path)
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+
+    if command == 'parse-worker':
+        parse_fixture_worker(sys.argv[2], sys.argv[3], int(sys.argv[4]))
+    elif command == 'record':
+        asyncio.run(record_fixture(sys.argv[2] if len(sys.argv) > 2 else 'pools_fixture.json'))
+    elif command == 'parse':
+        benchmark_pools_parsing(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif command == 'ratelimit':
+        sys.exit(0 if asyncio.run(benchmark_rate_limited_history()) else 1)
+    else:
+        requests_count = 200
+        if command is not None:
+            try:
+                requests_count = int(command)
+            except Exception:
+                print("Usage: python market_data_client.py [requests_count | record [path] | parse [fixture] | ratelimit]")
+                sys.exit(1)
+
+        sys.exit(0 if asyncio.run(benchmark_connection_pooling(requests_count)) else 1)
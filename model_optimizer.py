@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+
+"""
+CPU Model Optimizer for the DeFi Sentiment and Signal Models
+Exports a sequence classifier as a dynamically int8-quantized PyTorch model and an
+ONNX Runtime model, checks the accuracy delta and compares CPU latency/throughput
+"""
+
+import inspect
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+import torch.nn as nn
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer
+
+OPTIMIZED_DIR = './optimized-models'
+INT8_WEIGHTS = 'model-int8.pt'
+ONNX_MODEL = 'model.onnx'
+ONNX_INT8_MODEL = 'model-int8.onnx'
+MANIFEST = 'manifest.json'
+
+def optimized_path(model_name_or_path, optimized_dir=OPTIMIZED_DIR):
+    """Artifact directory for a hub id or local model path"""
+
+    slug = model_name_or_path.strip('./').replace('/', '--') or 'model'
+    return os.path.join(optimized_dir, slug)
+
+def quantize_dynamic_int8(model):
+    """Dynamically quantize every Linear layer to int8 (weights int8, activations quantized per batch)"""
+
+    return torch.ao.quantization.quantize_dynamic(model, {nn.Linear}, dtype=torch.qint8)
+
+class OnnxSequenceClassifier:
+    """ONNX Runtime session behind the same call signature as a transformers classifier"""
+
+    def __init__(self, path, num_threads=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+
+        self.session = ort.InferenceSession(path, options, providers=['CPUExecutionProvider'])
+        self.input_names = [node.name for node in self.session.get_inputs()]
+
+    def to(self, device):
+        return self
+
+    def eval(self):
+        return self
+
+    def __call__(self, **inputs):
+        feeds = {name: inputs[name].cpu().numpy().astype(np.int64) for name in self.input_names if name in inputs}
+        logits = self.session.run(None, feeds)[0]
+        return SimpleNamespace(logits=torch.from_numpy(logits))
+
+def load_optimized_classifier(model_name_or_path, optimized_dir=OPTIMIZED_DIR, prefer=('onnx', 'int8')):
+    """Load the first available optimized artifact for a model
+
+    Returns (model, tokenizer, backend), or None when nothing has been exported
+    (or onnxruntime is not installed and no int8 weights exist).
+    """
+
+    path = optimized_path(model_name_or_path, optimized_dir)
+    if not os.path.exists(os.path.join(path, MANIFEST)):
+        return None
+
+    for backend in prefer:
+        try:
+            if backend == 'onnx':
+                for filename in (ONNX_INT8_MODEL, ONNX_MODEL):
+                    if os.path.exists(os.path.join(path, filename)):
+                        model = OnnxSequenceClassifier(os.path.join(path, filename))
+                        return model, AutoTokenizer.from_pretrained(path), f'onnx ({filename})'
+            elif backend == 'int8' and os.path.exists(os.path.join(path, INT8_WEIGHTS)):
+                model = quantize_dynamic_int8(
+                    AutoModelForSequenceClassification.from_config(AutoConfig.from_pretrained(path)).eval()
+                )
+                model.load_state_dict(torch.load(os.path.join(path, INT8_WEIGHTS), weights_only=False))
+                return model, AutoTokenizer.from_pretrained(path), 'int8'
+        except ImportError:
+            continue
+        except Exception as e:
+            print(f"   ⚠️ Could not load {backend} artifact from {path}: {e}")
+
+    return None
+
+class ModelOptimizer:
+    """Export, verify and benchmark CPU-optimized variants of a sequence classifier"""
+
+    def __init__(self, model_name_or_path, optimized_dir=OPTIMIZED_DIR, max_length=128):
+        self.model_name_or_path = model_name_or_path
+        self.optimized_dir = optimized_dir
+        self.output_dir = optimized_path(model_name_or_path, optimized_dir)
+        self.max_length = max_length
+
+        print(f"📦 Loading {model_name_or_path} (fp32, CPU)...")
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name_or_path)
+        self.model = AutoModelForSequenceClassification.from_pretrained(model_name_or_path, num_labels=3).eval()
+
+    def export(self):
+        """Write the int8 PyTorch weights, the ONNX model and its int8 ONNX Runtime variant"""
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        self.model.config.save_pretrained(self.output_dir)
+        self.tokenizer.save_pretrained(self.output_dir)
+        artifacts = {}
+
+        print("\n🔧 Quantizing Linear layers to int8 (dynamic)...")
+        int8_model = quantize_dynamic_int8(self.model)
+        torch.save(int8_model.state_dict(), os.path.join(self.output_dir, INT8_WEIGHTS))
+        artifacts['int8'] = INT8_WEIGHTS
+
+        print("🔧 Exporting ONNX model...")
+        try:
+            artifacts.update(self.export_onnx())
+        except ImportError as e:
+            print(f"   ⚠️ ONNX export skipped ({e}); pip install onnx onnxruntime")
+
+        with open(os.path.join(self.output_dir, MANIFEST), 'w') as f:
+            json.dump({
+                'source': self.model_name_or_path,
+                'artifacts': artifacts,
+                'max_length': self.max_length,
+                'created': time.strftime('%Y-%m-%dT%H:%M:%S')
+            }, f, indent=2)
+
+        print(f"✅ Artifacts written to {self.output_dir}: {', '.join(artifacts.values())}")
+        return artifacts
+
+    def export_onnx(self):
+        import onnx  # noqa: F401 - fail early with ImportError when ONNX is unavailable
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        sample = self.tokenizer(['Token: ethereum'], return_tensors='pt')
+        input_names = [name for name in ('input_ids', 'attention_mask', 'token_type_ids') if name in sample]
+        dynamic_axes = {name: {0: 'batch', 1: 'sequence'} for name in input_names}
+        dynamic_axes['logits'] = {0: 'batch'}
+
+        onnx_path = os.path.join(self.output_dir, ONNX_MODEL)
+        # torch 2.5+ also has the dynamo exporter (the default from 2.9); stay on the TorchScript one
+        options = {'dynamo': False} if 'dynamo' in inspect.signature(torch.onnx.export).parameters else {}
+        torch.onnx.export(
+            self.model,
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=['logits'],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+            **options
+        )
+
+        quantize_dynamic(onnx_path, os.path.join(self.output_dir, ONNX_INT8_MODEL), weight_type=QuantType.QInt8)
+        return {'onnx': ONNX_MODEL, 'onnx_int8': ONNX_INT8_MODEL}
+
+    def variants(self):
+        """Every runnable variant: fp32 plus whatever export() produced"""
+
+        variants = {'fp32': self.model}
+        if os.path.exists(os.path.join(self.output_dir, INT8_WEIGHTS)):
+            variants['int8'] = load_optimized_classifier(self.model_name_or_path, self.optimized_dir, prefer=('int8',))[0]
+
+        for label, filename in (('onnx', ONNX_MODEL), ('onnx-int8', ONNX_INT8_MODEL)):
+            if os.path.exists(os.path.join(self.output_dir, filename)):
+                try:
+                    variants[label] = OnnxSequenceClassifier(os.path.join(self.output_dir, filename))
+                except ImportError:
+                    pass
+
+        return variants
+
+    def predict(self, model, texts, batch_size=32):
+        """Class probabilities for a list of texts"""
+
+        probabilities = []
+        with torch.no_grad():
+            for i in range(0, len(texts), batch_size):
+                inputs = self.tokenizer(
+                    texts[i:i + batch_size],
+                    return_tensors='pt',
+                    padding=True,
+                    truncation=True,
+                    max_length=self.max_length
+                )
+                probabilities.append(torch.softmax(model(**inputs).logits, dim=-1).numpy())
+        return np.concatenate(probabilities)
+
+    def check_accuracy(self, texts: List[str], labels: Optional[np.ndarray] = None):
+        """Accuracy delta and prediction agreement of each variant against fp32"""
+
+        print("\n🎯 Accuracy check:")
+        results = {}
+        reference = None
+
+        for label, model in self.variants().items():
+            probabilities = self.predict(model, texts)
+            predictions = probabilities.argmax(axis=1)
+            if reference is None:
+                reference = probabilities
+
+            result = {
+                'agreement': float((predictions == reference.argmax(axis=1)).mean()),
+                'max_prob_diff': float(np.abs(probabilities - reference).max())
+            }
+            if labels is not None:
+                result['accuracy'] = float((predictions == labels).mean())
+                result['accuracy_delta'] = result['accuracy'] - results.get('fp32', result)['accuracy']
+            results[label] = result
+
+            accuracy = f"accuracy {result['accuracy']:.2%} ({result['accuracy_delta']:+.2%}), " if labels is not None else ""
+            print(f"   {label:<10} {accuracy}agreement {result['agreement']:.2%}, "
+                  f"max prob diff {result['max_prob_diff']:.4f}")
+
+        return results
+
+    def benchmark(self, texts: List[str], batch_size=32, repeats=3):
+        """Single-text latency and batched throughput of each variant on CPU"""
+
+        print(f"\n⚡ CPU latency/throughput ({torch.get_num_threads()} threads):")
+        results = {}
+
+        for label, model in self.variants().items():
+            # Warm up
+            self.predict(model, texts[:batch_size], batch_size)
+
+            start_time = time.time()
+            for text in texts[:50]:
+                self.predict(model, [text])
+            latency = (time.time() - start_time) / min(len(texts), 50)
+
+            start_time = time.time()
+            for _ in range(repeats):
+                self.predict(model, texts, batch_size)
+            throughput = len(texts) * repeats / (time.time() - start_time)
+
+            results[label] = {'latency_ms': latency * 1000, 'throughput': throughput}
+
+        baseline = results['fp32']
+        for label, result in results.items():
+            print(f"   {label:<10} {result['latency_ms']:7.2f} ms/text, {result['throughput']:8.1f} texts/s "
+                  f"({result['throughput'] / baseline['throughput']:.2f}x)")
+
+        size = lambda filename: os.path.getsize(os.path.join(self.output_dir, filename)) / 1e6
+        fp32_size = sum(p.numel() * p.element_size() for p in self.model.parameters()) / 1e6
+        sizes = [f"fp32 {fp32_size:.1f} MB"] + [
+            f"{filename} {size(filename):.1f} MB" for filename in (INT8_WEIGHTS, ONNX_MODEL, ONNX_INT8_MODEL)
+            if os.path.exists(os.path.join(self.output_dir, filename))
+        ]
+        print(f"   Sizes: {', '.join(sizes)}")
+        return results
+
+def evaluation_samples(num_samples=512) -> Tuple[List[str], np.ndarray]:
+    """Labelled texts from the local data cache, or a synthetic series when the cache is empty"""
+
+    from train_defi_model import DeFiDataCollector, synthetic_raw_data
+
+    collector = DeFiDataCollector()
+    raw_data = collector.load_cached_data(days=30)
+    if not raw_data['tokens']:
+        raw_data = synthetic_raw_data(num_samples + 1, num_protocols=50)
+
+    samples = collector.prepare_training_dataset(raw_data)
+    samples = samples[-num_samples:]
+    return samples.texts(), samples.labels
+
+def optimize_model(model_name_or_path, num_samples=512):
+    """Export a model and report its accuracy delta and CPU speed"""
+
+    print("="*60)
+    print(f"🛠️  OPTIMIZING {model_name_or_path}")
+    print("="*60)
+
+    optimizer = ModelOptimizer(model_name_or_path)
+    optimizer.export()
+
+    texts, labels = evaluation_samples(num_samples)
+    accuracy = optimizer.check_accuracy(texts, labels)
+    speed = optimizer.benchmark(texts)
+    return accuracy, speed
+
+if __name__ == "__main__":
+    models = [arg for arg in sys.argv[1:] if not arg.startswith('--')]
+    if not models:
+        models = ['ElKulako/cryptobert']
+        if os.path.exists('./defi-trading-model-final'):
+            models.append('./defi-trading-model-final')
+
+    for model_name_or_path in models:
+        optimize_model(model_name_or_path)
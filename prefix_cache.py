@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+"""
+Prompt Prefix KV Cache
+Runs the static leading segment of a prompt (instructions, system text) through the
+model once and reuses its past_key_values, so each request only prefills its own tokens
+"""
+
+import copy
+import sys
+import time
+from collections import OrderedDict
+
+import torch
+
+class PrefixCache:
+    """past_key_values of fixed prompt prefixes, computed once per model
+
+    ``inputs`` returns generate() arguments for prefix + text: the prefix tokens,
+    then each text left-padded after them, and a private copy of the prefix
+    cache (generate extends the cache in place). The prefix is tokenized on its
+    own, so a prompt is always the prefix tokens followed by the text tokens.
+    """
+
+    def __init__(self, model, tokenizer, max_prefixes=8):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.max_prefixes = max_prefixes
+        self.entries = OrderedDict()  # prefix -> (input_ids, past_key_values)
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def get(self, prefix: str):
+        """Token ids and past_key_values for a prefix, computed on first use"""
+
+        entry = self.entries.get(prefix)
+        if entry is not None:
+            self.entries.move_to_end(prefix)
+            self.stats['hits'] += 1
+            return entry
+
+        device = next(self.model.parameters()).device
+        input_ids = self.tokenizer(prefix, return_tensors='pt')['input_ids'].to(device)
+        with torch.no_grad():
+            past_key_values = self.model(input_ids, use_cache=True).past_key_values
+
+        entry = self.entries[prefix] = (input_ids, past_key_values)
+        if len(self.entries) > self.max_prefixes:
+            self.entries.popitem(last=False)
+        self.stats['misses'] += 1
+        return entry
+
+    def inputs(self, prefix: str, texts):
+        """generate() keyword arguments for ``prefix + text`` for each text"""
+
+        prefix_ids, past_key_values = self.get(prefix)
+        encoded = self.tokenizer(
+            list(texts), return_tensors='pt', padding=True, padding_side='left', add_special_tokens=False
+        ).to(prefix_ids.device)
+
+        batch = encoded['input_ids'].shape[0]
+        input_ids = torch.cat([prefix_ids.expand(batch, -1), encoded['input_ids']], dim=1)
+        attention_mask = torch.cat([
+            torch.ones(batch, prefix_ids.shape[1], dtype=encoded['attention_mask'].dtype, device=prefix_ids.device),
+            encoded['attention_mask']
+        ], dim=1)
+
+        if isinstance(past_key_values, tuple):
+            # Per-layer (key, value) tuples from models without Cache support; never extended in place
+            past_key_values = tuple(
+                tuple(tensor.repeat_interleave(batch, dim=0) for tensor in layer) for layer in past_key_values
+            )
+        else:
+            past_key_values = copy.deepcopy(past_key_values)
+            if batch > 1:
+                past_key_values.batch_repeat_interleave(batch)
+
+        return {'input_ids': input_ids, 'attention_mask': attention_mask, 'past_key_values': past_key_values}
+
+SYSTEM_PROMPT = (
+    "You are a concise assistant for developers building AI and blockchain applications. "
+    "Answer in plain language, prefer short concrete examples, state assumptions explicitly, "
+    "and say so when something is uncertain instead of guessing.\n\n"
+)
+
+def benchmark_prefix_cache(model_name='gpt2', repeats=5, tolerance=1e-4):
+    """Time to first token with and without the prefix cache for both fixed prompt templates
+
+    Returns False when cached and full-prefill first-token logits differ by more than ``tolerance``.
+    """
+
+    from transformers import AutoModelForCausalLM, AutoTokenizer
+
+    from blockchain_analyzer_demo import ANALYSIS_PREFIX, ANALYSIS_SUFFIX
+    from contract_scanner import FUNCTION_BODIES
+
+    print("="*60)
+    print("⚡ PROMPT PREFIX KV CACHE BENCHMARK")
+    print("="*60)
+
+    device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
+    print(f"📦 Loading {model_name} on {device}")
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForCausalLM.from_pretrained(model_name).to(device)
+    model.eval()
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    cache = PrefixCache(model, tokenizer)
+    scenarios = [
+        ('Contract analysis template', ANALYSIS_PREFIX, [
+            f'    function action{i}(uint256 amount) public {{\n{body}\n    }}\n' + ANALYSIS_SUFFIX
+            for i, body in enumerate(FUNCTION_BODIES)
+        ]),
+        ('System prompt + question', SYSTEM_PROMPT, [
+            'How do I batch requests to a JSON-RPC node?',
+            'What is a reentrancy attack?',
+            'Explain gas optimization for loops.',
+            'When should I use a mapping instead of an array?',
+        ]),
+    ]
+
+    def first_token(inputs):
+        start_time = time.perf_counter()
+        with torch.no_grad():
+            output = model.generate(
+                **inputs, max_new_tokens=1, do_sample=False, pad_token_id=tokenizer.eos_token_id,
+                output_scores=True, return_dict_in_generate=True
+            )
+        return time.perf_counter() - start_time, output.scores[0]
+
+    passed = True
+    for label, prefix, texts in scenarios:
+        prefix_tokens = cache.get(prefix)[0].shape[1]
+        full_times, cached_times, max_difference = [], [], 0.0
+        for text in texts:
+            cached_inputs = cache.inputs(prefix, [text])
+            full_inputs = {key: value for key, value in cached_inputs.items() if key != 'past_key_values'}
+
+            full_best = cached_best = float('inf')
+            for _ in range(repeats):
+                elapsed, full_scores = first_token(full_inputs)
+                full_best = min(full_best, elapsed)
+                elapsed, cached_scores = first_token(cache.inputs(prefix, [text]))
+                cached_best = min(cached_best, elapsed)
+            full_times.append(full_best)
+            cached_times.append(cached_best)
+            max_difference = max(max_difference, (full_scores - cached_scores).abs().max().item())
+
+        text_tokens = sum(cache.inputs(prefix, [text])['input_ids'].shape[1] - prefix_tokens for text in texts)
+        full_ttft = sum(full_times) / len(full_times) * 1000
+        cached_ttft = sum(cached_times) / len(cached_times) * 1000
+        print(f"\n📝 {label}: {prefix_tokens}-token prefix, {text_tokens / len(texts):.0f} tokens per request")
+        print(f"   TTFT, full prefill:   {full_ttft:7.1f} ms")
+        print(f"   TTFT, cached prefix:  {cached_ttft:7.1f} ms ({full_ttft / cached_ttft:.2f}x)")
+        print(f"   Max first-token logit difference: {max_difference:.2e}")
+        if max_difference > tolerance:
+            print(f"   ❌ Cached prefix changes the logits (tolerance {tolerance:.0e})")
+            passed = False
+
+    return passed
+
+if __name__ == "__main__":
+    sys.exit(0 if benchmark_prefix_cache(sys.argv[1] if len(sys.argv) > 1 else 'gpt2') else 1)
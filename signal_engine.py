@@ -0,0 +1,121 @@
+"""
+Vectorized Signal Engine
+Scores a whole watchlist at once: technical, on-chain and DeFi scores, the weighted
+final score and the BUY/SELL/HOLD signal are NumPy operations over a columnar frame
+with exactly the arithmetic of the per-token path in DeFiTradingAI
+"""
+
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from defi_metrics import DeFiMetricsIndex
+from onchain_indexer import TransferIndexer
+
+SIGNAL_WEIGHTS = {
+    'technical': 0.3,
+    'sentiment': 0.2,
+    'onchain': 0.25,
+    'defi': 0.25
+}
+SIGNAL_THRESHOLD = 0.3  # |final score| above this trades, below it holds
+
+# Column -> default when the field is missing or null (CoinGecko sends null for some coins)
+TECHNICAL_COLUMNS = {
+    'price_change_percentage_24h': 0,
+    'volume_change_24h': 0,
+    'market_cap_rank': 1000
+}
+ONCHAIN_COLUMNS = ('transfers', 'previous_transfers', 'whale_net_flow', 'volume')
+
+def technical_inputs(token_data: Dict) -> List:
+    """Price change, volume change and market cap rank of a token, defaults filled in"""
+
+    return [default if token_data.get(column) is None else token_data[column]
+            for column, default in TECHNICAL_COLUMNS.items()]
+
+def technical_scores(price_change_24h, volume_change_24h, market_cap_rank) -> np.ndarray:
+    """calculate_technical_score for every row"""
+
+    score = np.zeros(len(price_change_24h))
+
+    # Price momentum
+    score += np.where(price_change_24h > 5, 0.3,
+             np.where(price_change_24h > 0, 0.1,
+             np.where(price_change_24h < -5, -0.3, -0.1)))
+
+    # Volume analysis
+    score += np.where(volume_change_24h > 50, 0.2, np.where(volume_change_24h > 0, 0.1, 0.0))
+
+    # Market cap rank
+    score += np.where(market_cap_rank < 100, 0.2, np.where(market_cap_rank < 500, 0.1, 0.0))
+
+    return np.clip(score, -1, 1)
+
+def combine_scores(technical, sentiment, onchain, defi):
+    """Weighted final score, signal and confidence for every row"""
+
+    final = (
+        technical * SIGNAL_WEIGHTS['technical'] +
+        sentiment * SIGNAL_WEIGHTS['sentiment'] +
+        onchain * SIGNAL_WEIGHTS['onchain'] +
+        defi * SIGNAL_WEIGHTS['defi']
+    )
+
+    buy = final > SIGNAL_THRESHOLD
+    sell = final < -SIGNAL_THRESHOLD
+    signal = np.where(buy, 'BUY', np.where(sell, 'SELL', 'HOLD'))
+    confidence = np.where(buy | sell, np.minimum(np.abs(final), 1.0), 1.0 - np.abs(final))
+    return final, signal, confidence
+
+def build_frame(token_data_list: List[Dict], sentiments: List[Dict], defi_index: DeFiMetricsIndex,
+                onchain_metrics: Callable[[Dict], Optional[Dict]]) -> Dict[str, np.ndarray]:
+    """Gather every token's inputs into NumPy columns (one O(1) lookup per token and source)"""
+
+    size = len(token_data_list)
+    technical = np.array([technical_inputs(token_data) for token_data in token_data_list], dtype=float)
+    technical = technical.reshape(size, len(TECHNICAL_COLUMNS))
+    frame = {column: technical[:, i] for i, column in enumerate(TECHNICAL_COLUMNS)}
+    frame['bullish'] = np.array([sentiment['probabilities']['bullish'] for sentiment in sentiments], dtype=float)
+    frame['bearish'] = np.array([sentiment['probabilities']['bearish'] for sentiment in sentiments], dtype=float)
+
+    defi = [defi_index.lookup(token_data['symbol']) for token_data in token_data_list]
+    for column in ('tvl_change_1d', 'pool_apy', 'pool_tvl', 'pool_count'):
+        frame[column] = np.array([np.nan if m[column] is None else m[column] for m in defi], dtype=float)
+
+    for column in ONCHAIN_COLUMNS:
+        frame[column] = np.zeros(size)
+    frame['onchain_indexed'] = np.zeros(size, dtype=bool)
+    for row, token_data in enumerate(token_data_list):
+        metrics = onchain_metrics(token_data)
+        if metrics:
+            frame['onchain_indexed'][row] = True
+            for column in ONCHAIN_COLUMNS:
+                frame[column][row] = metrics[column]
+
+    return frame
+
+def score_frame(frame: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """Technical, sentiment, on-chain, DeFi and final scores plus signals for a frame"""
+
+    technical = technical_scores(
+        frame['price_change_percentage_24h'], frame['volume_change_24h'], frame['market_cap_rank']
+    )
+    sentiment = frame['bullish'] - frame['bearish']
+    onchain = np.where(
+        frame['onchain_indexed'],
+        TransferIndexer.scores(*(frame[column] for column in ONCHAIN_COLUMNS)),
+        0.0
+    )
+    defi = DeFiMetricsIndex.scores(frame['tvl_change_1d'], frame['pool_apy'], frame['pool_tvl'], frame['pool_count'])
+    final, signal, confidence = combine_scores(technical, sentiment, onchain, defi)
+
+    return {
+        'technical': technical,
+        'sentiment': sentiment,
+        'onchain': onchain,
+        'defi': defi,
+        'final': final,
+        'signal': signal,
+        'confidence': confidence
+    }
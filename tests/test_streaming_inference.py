@@ -0,0 +1,45 @@
+"""Streaming AdvancedDeFiModel inference must match the full carried-state recomputation"""
+
+import os
+import sys
+
+import torch
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from train_defi_model import (AdvancedDeFiModel, SlidingWindowDataset, StreamingDeFiModel, stream_reference,
+                              streaming_max_difference, synthetic_raw_data)
+
+def small_model():
+    torch.manual_seed(0)
+    return AdvancedDeFiModel(input_dim=len(SlidingWindowDataset.FEATURES), hidden_dim=32, num_layers=2).eval()
+
+def series(num_points=120):
+    token_data = synthetic_raw_data(num_points)['tokens'][0]
+    return torch.from_numpy(SlidingWindowDataset.series_features(*SlidingWindowDataset.token_columns(token_data)))
+
+def test_streaming_matches_full_recomputation():
+    model = small_model()
+    features = series()
+    assert streaming_max_difference(model, StreamingDeFiModel(model, window=16), features) < 1e-5
+
+def test_tokens_keep_separate_streams():
+    model = small_model()
+    features = series()
+    streamer = StreamingDeFiModel(model, window=16)
+    for t in range(40):
+        streamer.step('a', features[t])
+        streamer.step('b', features[t + 50])
+
+    expected = stream_reference(model, features[:41], window=16)[-1]
+    assert (streamer.step('a', features[40]) - expected).abs().max() < 1e-5
+
+def test_state_is_bounded_by_window():
+    model = small_model()
+    features = series()
+    streamer = StreamingDeFiModel(model, window=16)
+    streamer.step('a', features[0])
+    size = streamer.state_bytes('a')
+    for row in features[1:]:
+        streamer.step('a', row)
+    assert streamer.state_bytes('a') == size
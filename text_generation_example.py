@@ -8,10 +8,11 @@ Demonstrates running language models on GPU
 import torch
 from transformers import GPT2LMHeadModel, GPT2Tokenizer
 import time
+from prefix_cache import PrefixCache
 
 class LocalTextGenerator:
-    def __init__(self, model_name='gpt2-medium'):
-        """Initialize the text generator"""
+    def __init__(self, model_name='gpt2-medium', system_prompt=None):
+        """Initialize the text generator (``system_prompt`` is a fixed prefix for every prompt)"""
         self.device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
 
         print(f"🚀 Initializing {model_name} on {self.device}")
@@ -28,6 +29,10 @@ class LocalTextGenerator:
         # Set padding token
         self.tokenizer.pad_token = self.tokenizer.eos_token
 
+        # The system prompt is prefilled once; each generate call only prefills its own prompt
+        self.system_prompt = system_prompt
+        self.prefix_cache = PrefixCache(self.model, self.tokenizer)
+
         model_size = sum(p.numel() for p in self.model.parameters())
         print(f"✅ Model loaded: {model_size/1e6:.1f}M parameters")
         print(f"💾 GPU Memory used: {torch.cuda.memory_allocated()/1e6:.2f} MB\n")
@@ -37,16 +42,22 @@ class LocalTextGenerator:
         print(f"📝 Prompt: {prompt}")
         print("🔄 Generating...\n")
 
-        # Encode prompt
-        input_ids = self.tokenizer.encode(prompt, return_tensors='pt').to(self.device)
+        # Encode prompt (after the cached system prompt, which max_length does not count)
+        if self.system_prompt:
+            inputs = self.prefix_cache.inputs(self.system_prompt, [prompt])
+            prefix_length = self.prefix_cache.get(self.system_prompt)[0].shape[1]
+        else:
+            inputs = {'input_ids': self.tokenizer.encode(prompt, return_tensors='pt').to(self.device)}
+            prefix_length = 0
+        input_ids = inputs['input_ids']
 
         # Generate
         start_time = time.time()
 
         with torch.no_grad():
             output = self.model.generate(
-                input_ids,
-                max_length=max_length,
+                **inputs,
+                max_length=max_length + prefix_length,
                 temperature=temperature,
                 top_k=top_k,
                 top_p=top_p,
@@ -57,7 +68,7 @@ class LocalTextGenerator:
         generation_time = time.time() - start_time
 
         # Decode output
-        generated_text = self.tokenizer.decode(output[0], skip_special_tokens=True)
+        generated_text = self.tokenizer.decode(output[0, prefix_length:], skip_special_tokens=True)
 
         tokens_generated = len(output[0]) - len(input_ids[0])
         tokens_per_second = tokens_generated / generation_time